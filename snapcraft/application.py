@@ -21,6 +21,7 @@ from __future__ import annotations
 import logging
 import os
 import sys
+from collections.abc import Mapping
 from typing import Any
 
 import craft_application.errors
@@ -60,6 +61,15 @@ MAPPED_ENV_VARS = {
 }
 
 
+def _get_mapped_env_vars(environ: Mapping[str, str]) -> dict[str, str]:
+    """Get the CRAFT_* environment variables set from their SNAPCRAFT_* variants."""
+    return {
+        craft_var: env_val
+        for craft_var, snapcraft_var in MAPPED_ENV_VARS.items()
+        if (env_val := environ.get(snapcraft_var))
+    }
+
+
 def _get_esm_error_for_base(base: str) -> None:
     """Raise an error appropriate for the base under ESM."""
     match base:
@@ -97,9 +107,7 @@ class Snapcraft(Application):
         # manifest generation is enabled.
         self._known_core24 = self._get_known_core24()
 
-        for craft_var, snapcraft_var in MAPPED_ENV_VARS.items():
-            if env_val := os.getenv(snapcraft_var):
-                os.environ[craft_var] = env_val
+        os.environ.update(_get_mapped_env_vars(os.environ))
 
     def _get_known_core24(self) -> bool:
         """Return true if the project is known to be core24."""
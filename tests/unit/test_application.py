@@ -19,8 +19,9 @@ import json
 import os
 import re
 import sys
+from pathlib import Path
 from textwrap import dedent
-from typing import cast
+from typing import Any, cast
 
 import craft_application.launchpad
 import craft_application.remote
@@ -40,6 +41,10 @@ from snapcraft.commands import PackCommand
 from snapcraft.errors import ClassicFallback
 from snapcraft.models.project import Architecture
 
+# Use the LibYAML bindings when PyYAML was built with them.
+_SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_SafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 @pytest.fixture(
     params=[
@@ -61,6 +66,14 @@ def mock_remote_build_run(mocker):
     return _mock_remote_build_run
 
 
+@pytest.fixture()
+def fake_host_base(mocker):
+    """Pretend this is an Ubuntu 24.04 system, to match PARSE_INFO_PROJECT."""
+    return mocker.patch.object(
+        util, "get_host_base", return_value=bases.BaseName("ubuntu", "24.04")
+    )
+
+
 @pytest.fixture()
 def mock_run_legacy(mocker):
     return mocker.patch("snapcraft_legacy.cli.legacy.legacy_run")
@@ -74,24 +87,35 @@ def mock_remote_build_argv(mocker):
     )
 
 
-@pytest.mark.parametrize("env_vars", application.MAPPED_ENV_VARS.items())
-def test_application_map_build_on_env_var(monkeypatch, env_vars):
-    """Test that instantiating the Snapcraft application class will set the value of the
-    SNAPCRAFT_* environment variables to CRAFT_*.
+@pytest.fixture(scope="module")
+def shared_app(tmp_path_factory):
+    """A Snapcraft application shared by tests that don't modify its state."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(tmp_path_factory.mktemp("shared_app"))
+        # Keep the constructor from mapping SNAPCRAFT_* variables into os.environ.
+        for snapcraft_var in application.MAPPED_ENV_VARS.values():
+            monkeypatch.delenv(snapcraft_var, raising=False)
+        return application.create_app()
+
+
+@pytest.mark.parametrize(
+    ("craft_var", "snapcraft_var"),
+    application.MAPPED_ENV_VARS.items(),
+    ids=list(application.MAPPED_ENV_VARS.values()),
+)
+def test_application_map_build_on_env_var(craft_var, snapcraft_var):
+    """Test that the value of the SNAPCRAFT_* environment variables is mapped to
+    CRAFT_*.
     """
-    craft_var = env_vars[0]
-    snapcraft_var = env_vars[1]
-    env_val = "woop"
+    environ = {snapcraft_var: "woop"}
 
-    monkeypatch.setenv(snapcraft_var, env_val)
-    assert os.getenv(craft_var) is None
+    assert application._get_mapped_env_vars(environ) == {craft_var: "woop"}
 
-    services.register_snapcraft_services()
-    snapcraft_services = services.SnapcraftServiceFactory(app=application.APP_METADATA)
-    application.Snapcraft(app=application.APP_METADATA, services=snapcraft_services)
 
-    assert os.getenv(craft_var) == env_val
-    assert os.getenv(snapcraft_var) == env_val
+@pytest.mark.parametrize("snapcraft_var", application.MAPPED_ENV_VARS.values())
+def test_application_map_build_on_env_var_empty(snapcraft_var):
+    """Empty SNAPCRAFT_* environment variables are not mapped."""
+    assert application._get_mapped_env_vars({snapcraft_var: ""}) == {}
 
 
 def test_application_map_log_verbosity_env_var(monkeypatch):
@@ -103,6 +127,7 @@ def test_application_map_log_verbosity_env_var(monkeypatch):
     monkeypatch.setenv("SNAPCRAFT_VERBOSITY_LEVEL", "TRACE")
     assert os.getenv("CRAFT_VERBOSITY_LEVEL") is None
 
+    services.register_snapcraft_services()
     snapcraft_services = services.SnapcraftServiceFactory(app=application.APP_METADATA)
     app = application.Snapcraft(
         app=application.APP_METADATA, services=snapcraft_services
@@ -118,54 +143,58 @@ def test_application_map_log_verbosity_env_var(monkeypatch):
     craft_cli.emit.set_mode(old_emit_level)
 
 
+def _dump_project(project: dict[str, Any]) -> bytes:
+    """Serialize a project as UTF-8 encoded YAML."""
+    return yaml.dump(project, Dumper=_SafeDumper, sort_keys=False, encoding="utf-8")
+
+
 @pytest.fixture()
 def extension_source(default_project):
-    source = default_project.marshal()
-    source["confinement"] = "strict"
-    source["apps"] = {
-        "app1": {
-            "command": "app1",
-            "extensions": ["fake-extension"],
-        }
+    return {
+        **default_project.marshal(),
+        "confinement": "strict",
+        "apps": {
+            "app1": {
+                "command": "app1",
+                "extensions": ["fake-extension"],
+            }
+        },
     }
-    return source
+
+
+_EXPECTED_EXPAND = {
+    "name": "default",
+    "version": "1.0",
+    "summary": "default project",
+    "description": "default project",
+    "base": "core24",
+    "license": "MIT",
+    "parts": {"fake-extension/fake-part": {"plugin": "nil"}},
+    "confinement": "strict",
+    "grade": "devel",
+    "apps": {"app1": {"command": "app1", "plugs": ["fake-plug"]}},
+}
 
 
 @pytest.mark.usefixtures("fake_extension")
 def test_application_expand_extensions(emitter, monkeypatch, extension_source, new_dir):
     (new_dir / "snap").mkdir()
-    (new_dir / "snap/snapcraft.yaml").write_text(json.dumps(extension_source))
+    (new_dir / "snap/snapcraft.yaml").write_bytes(_dump_project(extension_source))
 
     monkeypatch.setattr("sys.argv", ["snapcraft", "expand-extensions"])
     application.main()
-    emitter.assert_message(
-        dedent(
-            """\
-            name: default
-            version: '1.0'
-            summary: default project
-            description: default project
-            base: core24
-            license: MIT
-            parts:
-              fake-extension/fake-part:
-                plugin: nil
-            confinement: strict
-            grade: devel
-            apps:
-              app1:
-                command: app1
-                plugs:
-                - fake-plug
-        """
-        )
-    )
+
+    messages = [
+        interaction.args[1]
+        for interaction in emitter.interactions
+        if interaction.args[0] == "message"
+    ]
+    expanded = yaml.load(messages[-1], Loader=_SafeLoader)  # noqa: S506
+    assert expanded == _EXPECTED_EXPAND
 
 
 @pytest.mark.usefixtures("fake_extension")
-def test_application_extra_yaml_transforms(
-    monkeypatch, extension_source, new_dir, emitter
-):
+def test_application_extra_yaml_transforms(extension_source, new_dir):
     """Test that extra_yaml_transforms applies root keywords and expands extensions."""
     extension_source["build-packages"] = [{"to s390x": "test-package"}]
     extension_source["build-snaps"] = [{"to s390x": "test-snap"}]
@@ -178,35 +207,34 @@ def test_application_extra_yaml_transforms(
 
     project_path = new_dir / "snap/snapcraft.yaml"
     (new_dir / "snap").mkdir()
-    project_path.write_text(json.dumps(extension_source))
+    project_path.write_bytes(_dump_project(extension_source))
 
-    # Calling a lifecycle command will create a Project. Creating a Project
-    # without applying the extensions will fail because the "extensions" field
-    # will still be present on the yaml data, so it's enough to run "pull".
-    monkeypatch.setattr(
-        "sys.argv", ["snapcraft", "pull", "--destructive-mode", "--build-for", "s390x"]
-    )
+    # Rendering the project runs the same transforms as a lifecycle command
+    # without needing to run the lifecycle itself.
     app = application.create_app()
-    app.run()
+    app.services.update_kwargs("project", project_dir=new_dir)
+    project_service = cast(services.Project, app.services.get("project"))
+    project_service.configure(platform="s390x", build_for="s390x")
 
-    project = app.get_project()
+    project = project_service.get()
     assert "fake-extension/fake-part" in project.parts
     assert project.parts["snapcraft/core"]["build-packages"] == ["test-package"]
     assert project.parts["snapcraft/core"]["build-snaps"] == ["test-snap"]
 
 
-def test_application_managed_core20_fallback(monkeypatch, new_dir, mocker):
+def test_application_managed_core20_fallback(
+    monkeypatch, new_dir, mocker, mock_run_legacy
+):
     monkeypatch.setenv("SNAPCRAFT_BUILD_ENVIRONMENT", "managed-host")
 
     (new_dir / "snap").mkdir()
 
-    mock_legacy_run = mocker.patch("snapcraft_legacy.cli.legacy.legacy_run")
     mock_create_app = mocker.patch.object(application, "create_app")
 
     application.main()
 
     mock_create_app.assert_not_called()
-    mock_legacy_run.assert_called()
+    mock_run_legacy.assert_called()
 
 
 PARSE_INFO_PROJECT = dedent(
@@ -231,14 +259,16 @@ PARSE_INFO_PROJECT = dedent(
 """
 )
 
+# Parsed once at import; JSON is a YAML subset, so snapcraft reads it as-is.
+_PARSE_INFO_PROJECT_JSON = json.dumps(
+    yaml.load(PARSE_INFO_PROJECT, Loader=_SafeLoader)  # noqa: S506
+).encode()
+
 
-def test_get_project_parse_info(in_project_path):
+def test_get_project_parse_info(in_project_path, parse_info_project):
     """Test that parse-info data is correctly extracted and stored when loading
     the project from a YAML file."""
-    snap_dir = in_project_path / "snap"
-    snap_dir.mkdir()
-    project_yaml = snap_dir / "snapcraft.yaml"
-    project_yaml.write_text(PARSE_INFO_PROJECT)
+    parse_info_project(in_project_path)
 
     app = application.create_app()
     app.services.update_kwargs("project", project_dir=in_project_path)
@@ -270,27 +300,44 @@ APPSTREAM_CONTENTS = dedent(
       </releases>
     </component>
     """
-)
+).encode()
 
 
-def test_parse_info_integrated(monkeypatch, mocker, new_dir):
-    # Pretend this is an Ubuntu 24.04 system, to match the project's build-base
-    mocker.patch.object(
-        util, "get_host_base", return_value=bases.BaseName("ubuntu", "24.04")
-    )
+@pytest.fixture(scope="module")
+def parse_info_project_dir(tmp_path_factory) -> Path:
+    """Write the parse-info project files once for this module."""
+    project_dir = tmp_path_factory.mktemp("parse_info_project")
+    (project_dir / "snap").mkdir()
+    (project_dir / "snap/snapcraft.yaml").write_bytes(_PARSE_INFO_PROJECT_JSON)
+    (project_dir / "metainfo.xml").write_bytes(APPSTREAM_CONTENTS)
+    return project_dir
+
+
+@pytest.fixture
+def parse_info_project(parse_info_project_dir):
+    """Return a function that hardlinks the parse-info project into a directory.
+
+    Every linked file shares its inode with the module's copy, and craft-parts'
+    local source hardlinks them again into ``parts/*/src``. Tests and the
+    lifecycle must not modify them in place, or later tests get a corrupted
+    project.
+    """
 
+    def link_project(project_dir: Path) -> None:
+        (project_dir / "snap").mkdir()
+        for name in ("snap/snapcraft.yaml", "metainfo.xml"):
+            os.link(parse_info_project_dir / name, project_dir / name)
+
+    return link_project
+
+
+@pytest.mark.usefixtures("fake_host_base")
+def test_parse_info_integrated(monkeypatch, mocker, new_dir, parse_info_project):
     # Mock the installation of the core24 snap, as it can currently fail due
     # to network issues and it's not necessary for the test
     mocker.patch.object(snaps, "install_snaps")
 
-    snap_dir = new_dir / "snap"
-    snap_dir.mkdir()
-
-    project_yaml = snap_dir / "snapcraft.yaml"
-    project_yaml.write_text(PARSE_INFO_PROJECT)
-
-    metainfo_file = new_dir / "metainfo.xml"
-    metainfo_file.write_text(APPSTREAM_CONTENTS)
+    parse_info_project(new_dir)
 
     monkeypatch.setattr("sys.argv", ["snapcraft", "prime", "--destructive-mode"])
     app = application.create_app()
@@ -298,16 +345,16 @@ def test_parse_info_integrated(monkeypatch, mocker, new_dir):
 
     # Check for the parsed data directly in the generated snap.yaml
     snap_file = new_dir / "prime/meta/snap.yaml"
-    snap_yaml = yaml.safe_load(snap_file.read_text())
+    with snap_file.open("rb") as file:
+        snap_yaml = yaml.load(file, Loader=_SafeLoader)  # noqa: S506
 
     assert snap_yaml["summary"] == "Sample summary"
     assert snap_yaml["description"] == "Sample description"
     assert snap_yaml["version"] == "1.2.3"
 
 
-def test_application_plugins():
-    app = application.create_app()
-    plugins = app._get_app_plugins()
+def test_application_plugins(shared_app):
+    plugins = shared_app._get_app_plugins()
 
     # Just do some sanity checks.
     assert "python" in plugins
@@ -355,20 +402,11 @@ def test_application_dotnet_not_registered(base, build_base, snapcraft_yaml):
     assert "dotnet" not in craft_parts.plugins.get_registered_plugins()
 
 
-def test_default_command_integrated(monkeypatch, mocker, new_dir):
+@pytest.mark.usefixtures("fake_host_base")
+def test_default_command_integrated(monkeypatch, mocker, new_dir, parse_info_project):
     """Test that for core24 projects we accept "pack" as the default command."""
-
-    # Pretend this is an Ubuntu 24.04 system, to match the project's build-base
-    mocker.patch.object(
-        util, "get_host_base", return_value=bases.BaseName("ubuntu", "24.04")
-    )
-
-    snap_dir = new_dir / "snap"
-    snap_dir.mkdir()
-
     # The project itself doesn't really matter.
-    project_yaml = snap_dir / "snapcraft.yaml"
-    project_yaml.write_text(PARSE_INFO_PROJECT)
+    parse_info_project(new_dir)
 
     mocked_pack_run = mocker.patch.object(PackCommand, "run", return_value=0)
 
@@ -767,8 +805,7 @@ def test_get_argv_command(command, monkeypatch):
         ],
     )
 
-    app = application.create_app()
-    actual_command = app._get_argv_command()
+    actual_command = application.Snapcraft._get_argv_command()
 
     assert actual_command == command
 
@@ -806,7 +843,6 @@ def test_get_argv_command_with_options(args, expected_command, monkeypatch):
     """Get the command no with a variety of options."""
     monkeypatch.setattr("sys.argv", ["snapcraft", *args])
 
-    app = application.create_app()
-    command = app._get_argv_command()
+    command = application.Snapcraft._get_argv_command()
 
     assert command == expected_command